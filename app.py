@@ -1,34 +1,88 @@
 \
+import bisect
 import csv
 import io
 import json
 import re
+import time
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Any, Iterable
 
 import streamlit as st
 import yaml
+
+try:  # libyaml-backed C implementations are ~10x faster when available
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
 from slugify import slugify
 
+try:  # optional: pandas' C engine makes bulk CSV imports much faster
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:  # optional: C-accelerated JSON for large imports
+    import orjson
+except ImportError:
+    orjson = None
+
 from storage import PromptStorage
 
 # --------------- Utilities ---------------
 
+# Compiled once so reruns don't pay the re cache lookup per call.
+# Bounded quantifiers keep matching time constant on adversarial input:
+# at most 8 spaces/tabs of padding (no newlines) and 64-char variable names.
+_PLACEHOLDER_RE = re.compile(r"\{\{[ \t]{0,8}([A-Za-z0-9_.]{1,64})[ \t]{0,8}\}\}")
+
+# CSV columns checked, in order, for the free-form prompt text.
+_PROMPT_KEYS = ("prompt", "raw_prompt", "user", "text")
+
+# slugify is pure but surprisingly heavy (Unicode normalisation + regexes),
+# and it reruns on every keystroke in the Name field — memoize it.
+_slug = lru_cache(maxsize=1024)(slugify)
+
+@lru_cache(maxsize=1024)
+def _extract_placeholders_set(text: str) -> frozenset[str]:
+    # Find {{var}} patterns; callers that only need membership skip the sort.
+    # Cached because reruns re-scan the same prompt text; frozenset keeps the
+    # shared cached value immutable.
+    return frozenset(_PLACEHOLDER_RE.findall(text or ""))
+
 def extract_placeholders(text: str) -> List[str]:
-    # Find {{var}} patterns
-    return sorted(set(re.findall(r"\{\{\s*([a-zA-Z0-9_\.]+)\s*\}\}", text or "")))
+    return sorted(_extract_placeholders_set(text))
+
+def _detect_placeholders(sys_text: str, user_text: str) -> frozenset[str]:
+    # Union over both prompt blocks; the per-string scans are lru-cached, so
+    # the common no-edit rerun does no regex work at all.
+    return _extract_placeholders_set(sys_text) | _extract_placeholders_set(user_text)
 
 def render_with_vars(text: str, variables: Dict[str, str]) -> str:
-    def replacer(m):
+    if not text or "{{" not in text:
+        return text or ""
+    # One finditer pass + join beats re.sub's per-match callback dispatch.
+    out: List[str] = []
+    last = 0
+    for m in _PLACEHOLDER_RE.finditer(text):
+        out.append(text[last:m.start()])
         key = m.group(1).strip()
-        return str(variables.get(key, m.group(0)))
-    return re.sub(r"\{\{\s*([a-zA-Z0-9_\.]+)\s*\}\}", replacer, text or "")
-
-def token_estimate(s: str) -> int:
+        # only materialise the full match when the variable is missing
+        out.append(str(variables[key]) if key in variables else m.group(0))
+        last = m.end()
+    out.append(text[last:])
+    return "".join(out)
+
+@lru_cache(maxsize=4096)
+def token_estimate(*parts: str) -> int:
     # Naive token estimate (~4 chars per token heuristic). For rough sizing only.
-    if not s:
+    # Takes the parts separately so callers never concatenate just to measure.
+    total = sum(len(p) for p in parts if p)
+    if not total:
         return 0
-    return max(1, int(len(s) / 4))
+    return max(1, total >> 2)
 
 
 def optimize_prompt_text(raw_prompt: str) -> tuple[str, str]:
@@ -59,6 +113,12 @@ def parse_csv_tags(value: str | None) -> List[str]:
     return tags or ["imported"]
 
 
+def _split_lines(value: str | None) -> List[str]:
+    if not value:
+        return []
+    return [l for l in (s.strip() for s in value.splitlines()) if l]
+
+
 def normalise_variables(raw: str | None) -> List[Dict[str, str]]:
     if not raw:
         return []
@@ -75,16 +135,25 @@ def normalise_variables(raw: str | None) -> List[Dict[str, str]]:
     return vars_
 
 
-def build_template_from_csv_row(row: Dict[str, str], index: int) -> Dict[str, Any]:
-    """Create a template structure from a CSV row."""
-    prompt_text = next(
-        (row.get(key, "").strip() for key in ["prompt", "raw_prompt", "user", "text"] if row.get(key)),
-        "",
-    )
-    name = row.get("name") or row.get("title") or f"Imported Prompt {index + 1}"
-    description = row.get("description", "Imported from CSV")
-    system = row.get("system", "").strip()
-    user = row.get("user", "").strip()
+def build_template_from_csv_row(row: Dict[str, str], index: int, now: str | None = None) -> Dict[str, Any]:
+    """Create a template structure from a CSV row.
+
+    ``now`` lets bulk imports share one timestamp for the whole batch instead
+    of formatting a fresh one per row.
+    """
+    if now is None:
+        now = datetime.utcnow().isoformat() + "Z"
+    row_get = row.get  # bound method, skips attribute lookup per field
+    prompt_text = ""
+    for key in _PROMPT_KEYS:
+        value = row_get(key)
+        if value and value.strip():
+            prompt_text = value.strip()
+            break
+    name = row_get("name") or row_get("title") or f"Imported Prompt {index + 1}"
+    description = row_get("description", "Imported from CSV")
+    system = row_get("system", "").strip()
+    user = row_get("user", "").strip()
 
     if not system or not user:
         gen_system, gen_user = optimize_prompt_text(prompt_text or user)
@@ -92,80 +161,130 @@ def build_template_from_csv_row(row: Dict[str, str], index: int) -> Dict[str, An
         user = user or gen_user
 
     template: Dict[str, Any] = {
-        "id": slugify(name),
+        "id": _slug(name),
         "name": name,
         "description": description,
-        "use_case": row.get("use_case", "General analysis"),
-        "audience": row.get("audience", "Business stakeholders"),
-        "tone": row.get("tone", "Analytical and clear"),
-        "model_family": row.get("model_family", "OpenAI"),
-        "tags": parse_csv_tags(row.get("tags")),
-        "owner": row.get("owner", "csv-import"),
-        "status": row.get("status", "draft"),
-        "variables": normalise_variables(row.get("variables")),
+        "use_case": row_get("use_case", "General analysis"),
+        "audience": row_get("audience", "Business stakeholders"),
+        "tone": row_get("tone", "Analytical and clear"),
+        "model_family": row_get("model_family", "OpenAI"),
+        "tags": parse_csv_tags(row_get("tags")),
+        "owner": row_get("owner", "csv-import"),
+        "status": row_get("status", "draft"),
+        "variables": normalise_variables(row_get("variables")),
         "system": system,
         "user": user,
-        "tools": row.get("tools", ""),
-        "evaluation": row.get("evaluation") or row.get("evaluation_criteria", ""),
-        "references": [
-            l.strip()
-            for l in (row.get("references", "").splitlines() if row.get("references") else [])
-            if l.strip()
-        ],
+        "tools": row_get("tools", ""),
+        "evaluation": row_get("evaluation") or row_get("evaluation_criteria", ""),
+        "references": _split_lines(row_get("references")),
         "safety": {
-            "do": [
-                s.strip()
-                for s in (row.get("safety_do", "").splitlines() if row.get("safety_do") else [])
-                if s.strip()
-            ],
-            "dont": [
-                s.strip()
-                for s in (row.get("safety_dont", "").splitlines() if row.get("safety_dont") else [])
-                if s.strip()
-            ],
+            "do": _split_lines(row_get("safety_do")),
+            "dont": _split_lines(row_get("safety_dont")),
         },
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
+        "created_at": now,
+        "updated_at": now,
     }
     return template
 
 
 def import_csv(file_buffer: io.BytesIO) -> Iterable[Dict[str, Any]]:
-    raw = file_buffer.read()
-    if not raw:
-        return []
+    now = datetime.utcnow().isoformat() + "Z"
+    if pd is not None:
+        file_buffer.seek(0)
+        try:
+            df = pd.read_csv(
+                file_buffer, dtype=str, keep_default_na=False, na_filter=False,
+                encoding_errors="replace",
+            )
+        except pd.errors.EmptyDataError:
+            return []
+        return [
+            build_template_from_csv_row(row, idx, now)
+            for idx, row in enumerate(df.to_dict(orient="records"))
+            if any((value or "").strip() for value in row.values())
+        ]
+
+    def _parse(encoding: str) -> List[Dict[str, Any]]:
+        file_buffer.seek(0)
+        # Stream rows straight off the upload buffer so decoding and CSV
+        # parsing pipeline together instead of materialising bytes + str copies.
+        wrapper = io.TextIOWrapper(file_buffer, encoding=encoding, newline="")
+        try:
+            reader = csv.DictReader(wrapper)
+            if not reader.fieldnames:
+                return []
+            return [
+                build_template_from_csv_row(row, idx, now)
+                for idx, row in enumerate(reader)
+                if any((value or "").strip() for value in row.values())
+            ]
+        finally:
+            wrapper.detach()  # keep the underlying buffer usable by the caller
+
     try:
-        text = raw.decode("utf-8")
+        return _parse("utf-8")
     except UnicodeDecodeError:
-        text = raw.decode("latin-1")
+        return _parse("latin-1")
+
+def _build_blob(t: Dict[str, Any]) -> str:
+    """Lowercased search text for a template, computed once per mutation."""
+    return " ".join([
+        t.get("name",""), t.get("description",""),
+        t.get("system",""), t.get("user",""),
+        " ".join(t.get("tags", [])), t.get("owner","")
+    ]).lower()
 
-    reader = csv.DictReader(io.StringIO(text))
-    if not reader.fieldnames:
-        raise ValueError("CSV file must include a header row.")
 
-    templates = []
-    for idx, row in enumerate(reader):
-        if not any((value or "").strip() for value in row.values()):
-            continue
-        template = build_template_from_csv_row(row, idx)
-        templates.append(template)
-    return templates
+def _attach_runtime_keys(t: Dict[str, Any]) -> None:
+    """Refresh derived, filter-time fields; storage strips these on save."""
+    t["_search_blob"] = _build_blob(t)
+    t["_tag_set"] = frozenset(t.get("tags", ()))
+
+
+def _clone_template(t: Dict[str, Any]) -> Dict[str, Any]:
+    """Clone a template without a JSON encode/decode roundtrip.
+
+    Strings are immutable so sharing them is safe; only the mutable
+    containers need copying.
+    """
+    d = dict(t)
+    d["tags"] = list(t.get("tags", ()))
+    d["variables"] = [dict(v) for v in t.get("variables", ())]
+    d["references"] = list(t.get("references", ()))
+    safety = t.get("safety", {})
+    d["safety"] = {"do": list(safety.get("do", ())), "dont": list(safety.get("dont", ()))}
+    return d
+
+
+def _id_index(store: Dict[str, Any]) -> Dict[str, int]:
+    """Map template id -> position in store['templates'] for O(1) lookups.
+
+    Cached per store version so repeat lookups within a rerun reuse one build;
+    _bump_store_version (called on every flush) invalidates it.
+    """
+    version = st.session_state.get("_store_version", 0)
+    cached = st.session_state.get("_id_index_cache")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    index = {t["id"]: i for i, t in enumerate(store.get("templates", [])) if t.get("id")}
+    st.session_state["_id_index_cache"] = (version, index)
+    return index
+
 
 def find_template(store: Dict[str, Any], template_id: str) -> Dict[str, Any] | None:
-    for t in store.get("templates", []):
-        if t.get("id") == template_id:
-            return t
-    return None
+    idx = _id_index(store).get(template_id)
+    return store["templates"][idx] if idx is not None else None
 
 
 def merge_templates(store: Dict[str, Any], templates: Iterable[Dict[str, Any]]) -> tuple[int, int]:
     store.setdefault("templates", [])
-    id_index = {tpl.get("id"): idx for idx, tpl in enumerate(store["templates"]) if tpl.get("id")}
+    id_index = _id_index(store)
     new_count, upd_count = 0, 0
     for tpl in templates:
         tid = tpl.get("id")
         if not tid:
             continue
+        _attach_runtime_keys(tpl)
         if tid in id_index:
             store["templates"][id_index[tid]] = tpl
             upd_count += 1
@@ -175,6 +294,107 @@ def merge_templates(store: Dict[str, Any], templates: Iterable[Dict[str, Any]])
             new_count += 1
     return new_count, upd_count
 
+# --------------- Cached store access ---------------
+
+@st.cache_resource
+def _get_storage() -> PromptStorage:
+    return PromptStorage()
+
+
+@st.cache_data(show_spinner=False)
+def _load_store(version: int, mtime: float) -> Dict[str, Any]:
+    # `version` and `mtime` only key the cache: the version is bumped after every
+    # in-app mutation, the file mtime catches edits made outside the app.
+    # Runtime keys are attached here so the cached value already carries them
+    # and reruns don't rebuild every blob.
+    store = _get_storage().load()
+    for t in store.get("templates", []):
+        _attach_runtime_keys(t)
+    return store
+
+
+def _bump_store_version() -> None:
+    st.session_state["_store_version"] = st.session_state.get("_store_version", 0) + 1
+
+
+@st.cache_data(show_spinner=False)
+def _filter_options(updated_at: str, _templates: List[Dict[str, Any]]) -> tuple[List[str], List[str], List[str]]:
+    """Tag/model/owner option lists, recomputed only when the store changes."""
+    tags_set, models_set, owners_set = set(), set(), set()
+    for t in _templates:
+        tags_set.update(t.get("tags", ()))
+        if t.get("model_family"):
+            models_set.add(t["model_family"])
+        if t.get("owner"):
+            owners_set.add(t["owner"])
+    return sorted(tags_set), sorted(models_set), sorted(owners_set)
+
+
+@st.cache_data(show_spinner=False)
+def _search_corpus(updated_at: str, _templates: List[Dict[str, Any]]) -> tuple[str, List[int]]:
+    """All template search blobs joined into one string, plus start offsets.
+
+    Keyword search then becomes a handful of C-level ``str.find`` calls over
+    one buffer instead of a Python-level scan per template.
+    """
+    parts: List[str] = []
+    offsets: List[int] = []
+    pos = 0
+    for t in _templates:
+        blob = t.get("_search_blob") or _build_blob(t)
+        offsets.append(pos)
+        parts.append(blob)
+        pos += len(blob) + 1  # +1 for the separator
+    return "\n".join(parts), offsets
+
+
+def _keyword_candidates(store: Dict[str, Any], q_lower: str) -> List[Dict[str, Any]]:
+    """Templates whose search blob contains ``q_lower``."""
+    templates = store.get("templates", [])
+    if not q_lower:
+        return templates
+    corpus, offsets = _search_corpus(
+        store.get("meta", {}).get("updated_at", ""), templates
+    )
+    hits: List[Dict[str, Any]] = []
+    start = corpus.find(q_lower)
+    while start != -1:
+        i = bisect.bisect_right(offsets, start) - 1
+        hits.append(templates[i])
+        if i + 1 >= len(offsets):
+            break
+        # resume at the next template's offset so the loop is O(matching
+        # templates), not O(occurrences of the query in the corpus)
+        start = corpus.find(q_lower, offsets[i + 1])
+    return hits
+
+
+@st.cache_data(show_spinner=False)
+def _template_yaml(tid: str, updated_at: str, _t: Dict[str, Any]) -> bytes:
+    # Keyed on (id, updated_at) so unchanged templates reuse the cached dump;
+    # the leading underscore keeps Streamlit from hashing the dict itself.
+    public = {k: v for k, v in _t.items() if not k.startswith("_")}
+    return yaml.dump({"templates": [public]}, Dumper=_YamlDumper, sort_keys=False).encode("utf-8")
+
+
+def _mark_dirty() -> None:
+    """Record that the store has pending mutations; persisted by _flush_store."""
+    st.session_state["_dirty"] = True
+
+
+# Minimum seconds between version snapshots; rapid edits coalesce into one.
+_SNAPSHOT_INTERVAL = 60.0
+
+
+def _flush_store(storage: PromptStorage, store: Dict[str, Any]) -> None:
+    """Write the store to disk at most once per rerun, debouncing snapshots."""
+    if st.session_state.pop("_dirty", False):
+        snapshot = time.time() - st.session_state.get("_last_snapshot", 0.0) >= _SNAPSHOT_INTERVAL
+        storage.save(store, snapshot=snapshot)
+        if snapshot:
+            st.session_state["_last_snapshot"] = time.time()
+        _bump_store_version()
+
 # --------------- UI: Sidebar ---------------
 
 st.set_page_config(page_title="GenAI Prompt Template Repository", page_icon="🧩", layout="wide")
@@ -182,8 +402,8 @@ st.set_page_config(page_title="GenAI Prompt Template Repository", page_icon="
 st.sidebar.title("🧩 Prompt Repo")
 st.sidebar.caption("Curate, version, and share prompt templates.")
 
-storage = PromptStorage()
-store = storage.load()
+storage = _get_storage()
+store = _load_store(st.session_state.get("_store_version", 0), storage.data_mtime())
 
 # Import/export
 with st.sidebar.expander("📤 Import / Export", expanded=False):
@@ -205,24 +425,26 @@ with st.sidebar.expander("📤 Import / Export", expanded=False):
                         st.warning("CSV file did not contain any prompts to import.")
                     else:
                         new_count, upd_count = merge_templates(store, templates)
-                        storage.save(store)
+                        _mark_dirty()
                         up.seek(0)
-                        storage.record_import(up.read(), "csv")
+                        storage.record_import_file(up, "csv")
                         st.success(
                             f"Imported {new_count} new, updated {upd_count} templates from CSV (auto-optimized prompts)."
                         )
                 else:
-                    raw = up.read()
+                    # Parse straight off the upload instead of copying it into
+                    # a bytes object first.
                     if fmt == "JSON":
-                        imported = json.loads(raw)
+                        imported = orjson.loads(up.getvalue()) if orjson is not None else json.load(up)
                     else:
-                        imported = yaml.safe_load(raw)
+                        imported = yaml.load(up, Loader=_YamlLoader)
                     if isinstance(imported, dict) and "templates" in imported:
                         # Merge strategy: upsert by id
                         new_count, upd_count = merge_templates(store, imported["templates"])
-                        storage.save(store)
+                        _mark_dirty()
                         # keep original file
-                        storage.record_import(raw, fmt.lower())
+                        up.seek(0)
+                        storage.record_import_file(up, fmt.lower())
                         st.success(f"Imported {new_count} new, updated {upd_count} templates.")
                     else:
                         st.error("Invalid structure: expected an object with a 'templates' array.")
@@ -230,23 +452,35 @@ with st.sidebar.expander("📤 Import / Export", expanded=False):
                 st.exception(e)
     with col_exp:
         if st.button(f"Export {fmt}"):
-            payload = store
+            payload = PromptStorage._serializable(store)
             if fmt == "JSON":
                 st.download_button("Download JSON", data=json.dumps(payload, indent=2), file_name="prompts-export.json")
             elif fmt == "YAML":
-                st.download_button("Download YAML", data=yaml.safe_dump(payload, sort_keys=False), file_name="prompts-export.yaml")
+                st.download_button("Download YAML", data=yaml.dump(payload, Dumper=_YamlDumper, sort_keys=False), file_name="prompts-export.yaml")
             else:
                 # CSV export not supported yet
                 st.info("CSV export coming soon. Use JSON or YAML for now.")
 
 # Filters
 with st.sidebar.expander("🔎 Filters", expanded=True):
-    q = st.text_input("Keyword search (name/desc/text/tags/owner)", placeholder="e.g., email, onboarding, RAG")
-    all_tags = sorted({tag for t in store.get("templates", []) for tag in t.get("tags", [])})
+    # A form keeps typing from triggering a full rerun per keystroke; the
+    # search only applies on submit.
+    with st.form("keyword_search", clear_on_submit=False):
+        q_draft = st.text_input(
+            "Keyword search (name/desc/text/tags/owner)",
+            value=st.session_state.get("q_applied", ""),
+            placeholder="e.g., email, onboarding, RAG",
+        )
+        if st.form_submit_button("Apply"):
+            st.session_state["q_applied"] = q_draft
+    q = st.session_state.get("q_applied", "")
+    all_tags, all_models, all_owners = _filter_options(
+        store.get("meta", {}).get("updated_at", ""), store.get("templates", [])
+    )
     tag_sel = st.multiselect("Tags", options=all_tags)
-    model_sel = st.multiselect("Model family", options=sorted({t.get("model_family","") for t in store.get("templates", []) if t.get("model_family")}))
+    model_sel = st.multiselect("Model family", options=all_models)
     status_sel = st.multiselect("Status", options=["draft","approved","deprecated"])
-    owner_sel = st.multiselect("Owner", options=sorted({t.get("owner","") for t in store.get("templates", []) if t.get("owner")}))
+    owner_sel = st.multiselect("Owner", options=all_owners)
 
 # --------------- UI: Main ---------------
 
@@ -279,13 +513,14 @@ with st.form("editor", clear_on_submit=False):
     # Variables block
     st.markdown("#### Variables")
     # auto-detect
-    detected = sorted(set(extract_placeholders(user_prompt)) | set(extract_placeholders(sys_prompt)))
+    detected_set = _detect_placeholders(sys_prompt, user_prompt)
+    detected = sorted(detected_set)
     st.caption("Detected from prompts: " + (", ".join(detected) if detected else "—"))
     var_rows = st.session_state.get("var_rows", [])
     # sync session var list with detected (add if missing)
-    for d in detected:
-        if d not in [v.get("name") for v in var_rows]:
-            var_rows.append({"name": d, "description": "", "default": ""})
+    existing_names = {v.get("name") for v in var_rows}
+    for d in sorted(detected_set - existing_names):
+        var_rows.append({"name": d, "description": "", "default": ""})
     # show editable table
     new_rows = []
     for i, row in enumerate(var_rows):
@@ -305,12 +540,22 @@ with st.form("editor", clear_on_submit=False):
         st.experimental_rerun()
 
     # Identify existing template id from name slug
-    tid = slugify(name) if name else ""
+    tid = _slug(name) if name else ""
     submit = st.form_submit_button("💾 Save Template")
     if submit:
         if not name:
             st.error("Name is required.")
         else:
+            now = datetime.utcnow().isoformat() + "Z"
+            # new_rows already has exactly the saved keys; filter and dedupe
+            # by name instead of rebuilding each dict field-by-field
+            seen_vars = set()
+            vars_out = []
+            for r in new_rows:
+                n = r.get("name")
+                if n and n not in seen_vars:
+                    seen_vars.add(n)
+                    vars_out.append(r)
             tpl = {
                 "id": tid,
                 "name": name,
@@ -322,7 +567,7 @@ with st.form("editor", clear_on_submit=False):
                 "tags": [t.strip() for t in tags.split(",") if t.strip()],
                 "owner": owner,
                 "status": status,
-                "variables": [{"name": r["name"], "description": r["description"], "default": r["default"]} for r in new_rows if r["name"]],
+                "variables": vars_out,
                 "system": sys_prompt,
                 "user": user_prompt,
                 "tools": tools,
@@ -330,23 +575,21 @@ with st.form("editor", clear_on_submit=False):
                            "dont": [l for l in safety_dont.splitlines() if l.strip()]},
                 "evaluation": eval_criteria,
                 "references": [l for l in references.splitlines() if l.strip()],
-                "updated_at": datetime.utcnow().isoformat() + "Z",
+                "updated_at": now,
             }
+            _attach_runtime_keys(tpl)
             existing = find_template(store, tid)
             if existing:
                 # keep created_at
-                tpl["created_at"] = existing.get("created_at", datetime.utcnow().isoformat() + "Z")
-                # replace
-                for i, ex in enumerate(store["templates"]):
-                    if ex["id"] == tid:
-                        store["templates"][i] = tpl
-                        break
+                tpl["created_at"] = existing.get("created_at", now)
+                # replace via the id index instead of scanning the list
+                store["templates"][_id_index(store)[tid]] = tpl
                 st.success(f"Updated template '{name}'.")
             else:
-                tpl["created_at"] = datetime.utcnow().isoformat() + "Z"
+                tpl["created_at"] = now
                 store["templates"].append(tpl)
                 st.success(f"Created template '{name}'.")
-            storage.save(store)
+            _mark_dirty()
 
 # Preview panel
 st.subheader("🔍 Preview & Tryout")
@@ -359,7 +602,7 @@ with col_l:
     if pick != "—":
         chosen = next((t for t in store["templates"] if t["name"] == pick), None)
         if chosen:
-            st.json({k: v for k, v in chosen.items() if k not in ["system","user","tools"]})
+            st.json({k: v for k, v in chosen.items() if k not in ["system","user","tools"] and not k.startswith("_")})
 with col_r:
     if chosen:
         st.markdown("**System**")
@@ -380,7 +623,7 @@ if pick != "—" and chosen:
     rendered_user = render_with_vars(chosen.get("user",""), runtime_vals)
     st.markdown("**Rendered Prompt**")
     st.code(f"[SYSTEM]\n{rendered_system}\n\n[USER]\n{rendered_user}")
-    est = token_estimate(rendered_system + rendered_user)
+    est = token_estimate(rendered_system, rendered_user)
     st.caption(f"Estimated tokens: ~{est}")
 
     st.download_button("⬇️ Download rendered prompt (txt)",
@@ -390,29 +633,55 @@ if pick != "—" and chosen:
 # --------------- Catalog Table ---------------
 
 st.subheader("📚 Catalog")
-# apply filters
+# apply filters — the keyword is resolved against the shared corpus first,
+# then the set filters run only over those candidates
+q_lower = q.lower() if q else ""
+tag_set_f = frozenset(tag_sel)
+model_set_f = frozenset(model_sel)
+status_set_f = frozenset(status_sel)
+owner_set_f = frozenset(owner_sel)
 def match_filters(t):
-    textblob = " ".join([
-        t.get("name",""), t.get("description",""),
-        t.get("system",""), t.get("user",""),
-        " ".join(t.get("tags", [])), t.get("owner","")
-    ]).lower()
-    if q and q.lower() not in textblob:
+    if tag_set_f and not tag_set_f.issubset(t.get("_tag_set", frozenset())):
         return False
-    if tag_sel and not set(tag_sel).issubset(set(t.get("tags", []))):
+    if model_set_f and t.get("model_family") not in model_set_f:
         return False
-    if model_sel and t.get("model_family") not in set(model_sel):
+    if status_set_f and t.get("status") not in status_set_f:
         return False
-    if status_sel and t.get("status") not in set(status_sel):
-        return False
-    if owner_sel and t.get("owner") not in set(owner_sel):
+    if owner_set_f and t.get("owner") not in owner_set_f:
         return False
     return True
 
-filtered = [t for t in store.get("templates", []) if match_filters(t)]
-# light "table"
-for t in filtered:
-    with st.expander(f"🧩 {t['name']}  •  {', '.join(t.get('tags', []))}  •  {t.get('status','draft')}", expanded=False):
+filtered = [t for t in _keyword_candidates(store, q_lower) if match_filters(t)]
+if not filtered:
+    st.caption("No templates match the current filters.")
+else:
+    # One dataframe widget instead of O(N) expanders/buttons per rerun;
+    # the action panel is only built for the selected row.
+    PAGE_SIZE = 50
+    if len(filtered) > PAGE_SIZE:
+        pages = (len(filtered) + PAGE_SIZE - 1) // PAGE_SIZE
+        page = int(st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)) - 1
+    else:
+        page = 0
+    page_templates = filtered[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+    rows = [{
+        "Name": t["name"],
+        "Tags": ", ".join(t.get("tags", [])),
+        "Status": t.get("status", "draft"),
+        "Model family": t.get("model_family", ""),
+        "Owner": t.get("owner", ""),
+        "Updated": t.get("updated_at", ""),
+    } for t in page_templates]
+    event = st.dataframe(
+        rows,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+    )
+    sel = event.selection.rows
+    if sel:
+        t = page_templates[sel[0]]
         colA, colB = st.columns([2,1])
         with colA:
             st.write(t.get("description","—"))
@@ -424,22 +693,31 @@ for t in filtered:
         c1, c2, c3 = st.columns(3)
         with c1:
             if st.button(f"Delete '{t['name']}'", key=f"del_{t['id']}"):
-                store["templates"] = [x for x in store["templates"] if x["id"] != t["id"]]
-                storage.save(store)
+                idx = _id_index(store).get(t["id"])
+                if idx is not None:
+                    store["templates"].pop(idx)
+                _mark_dirty()
+                _flush_store(storage, store)  # persist before the rerun interrupts the script
                 st.warning(f"Deleted '{t['name']}'.")
                 st.experimental_rerun()
         with c2:
             if st.button(f"Duplicate '{t['name']}'", key=f"dup_{t['id']}"):
-                dup = json.loads(json.dumps(t))
+                dup = _clone_template(t)
                 dup["id"] = f"{t['id']}-copy"
                 dup["name"] = f"{t['name']} (Copy)"
-                dup["created_at"] = datetime.utcnow().isoformat() + "Z"
-                dup["updated_at"] = datetime.utcnow().isoformat() + "Z"
+                now = datetime.utcnow().isoformat() + "Z"
+                dup["created_at"] = now
+                dup["updated_at"] = now
+                _attach_runtime_keys(dup)
                 store["templates"].append(dup)
-                storage.save(store)
+                _mark_dirty()
+                _flush_store(storage, store)  # persist before the rerun interrupts the script
                 st.success(f"Duplicated '{t['name']}'.")
                 st.experimental_rerun()
         with c3:
             st.download_button("Export (YAML)",
-                               data=yaml.safe_dump({"templates":[t]}, sort_keys=False),
+                               data=_template_yaml(t["id"], t.get("updated_at",""), t),
                                file_name=f"{t['id']}.yaml")
+
+# Persist any mutations from this rerun in a single write.
+_flush_store(storage, store)
@@ -1,11 +1,37 @@
 """Storage utilities for prompt repository."""
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+
+try:  # optional C-accelerated JSON; stdlib json is the fallback
+    import orjson
+except ImportError:
+    orjson = None
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, Optional
+
+
+# Shared pool for background snapshot writes; the canonical file is always
+# written synchronously, only the snapshot copy may lag.
+_IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prompt-storage")
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+
+def _write_snapshot(path: str, data: bytes, hash_path: str, content_hash: str) -> None:
+    _write_bytes(path, data)
+    # Record the hash only once the snapshot is on disk, so a failed write
+    # is retried on the next save instead of being skipped as a duplicate.
+    with open(hash_path, "w", encoding="utf-8") as fh:
+        fh.write(content_hash)
 
 
 @dataclass
@@ -18,12 +44,20 @@ class PromptStorage:
 
     def __post_init__(self) -> None:
         self._ensure_dirs()
+        self._pending_snapshots: list[Future] = []
 
     def _ensure_dirs(self) -> None:
         os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
         os.makedirs(self.versions_dir, exist_ok=True)
         os.makedirs(self.imports_dir, exist_ok=True)
 
+    def data_mtime(self) -> float:
+        """Modification time of the canonical store file (0.0 if missing)."""
+        try:
+            return os.path.getmtime(self.data_path)
+        except OSError:
+            return 0.0
+
     def load(self) -> Dict[str, Any]:
         """Load the store from disk, creating a default skeleton if missing."""
         if not os.path.exists(self.data_path):
@@ -31,28 +65,117 @@ class PromptStorage:
                 "meta": {"version": 1, "updated_at": datetime.utcnow().isoformat() + "Z"},
                 "templates": [],
             }
-        with open(self.data_path, "r", encoding="utf-8") as fh:
-            return json.load(fh)
+        with open(self.data_path, "rb") as fh:
+            raw = fh.read()
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
 
-    def save(self, store: Dict[str, Any]) -> None:
-        """Persist the store and capture a timestamped snapshot."""
-        self._ensure_dirs()
-        timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
-        snapshot_path = os.path.join(self.versions_dir, f"prompts-{timestamp}.json")
-        with open(snapshot_path, "w", encoding="utf-8") as fh:
-            json.dump(store, fh, indent=2)
+    @staticmethod
+    def _dumps(payload: Dict[str, Any], indent: bool) -> bytes:
+        """Serialize to bytes, preferring orjson when installed."""
+        if orjson is not None:
+            option = orjson.OPT_INDENT_2 if indent else 0
+            return orjson.dumps(payload, option=option)
+        if indent:
+            return json.dumps(payload, indent=2).encode("utf-8")
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def _serializable(store: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of the store without underscore-prefixed runtime-only keys."""
+        out = dict(store)
+        out["templates"] = [
+            {k: v for k, v in t.items() if not k.startswith("_")}
+            for t in store.get("templates", [])
+        ]
+        return out
 
+    def save(self, store: Dict[str, Any], snapshot: bool = True) -> None:
+        """Persist the store; optionally capture a timestamped snapshot.
+
+        Callers that autosave frequently can pass ``snapshot=False`` and let
+        the app schedule coalesced snapshots instead of one per keystroke.
+        """
+        self._ensure_dirs()
+        now = datetime.utcnow()
         store.setdefault("meta", {})
-        store["meta"]["updated_at"] = datetime.utcnow().isoformat() + "Z"
-        with open(self.data_path, "w", encoding="utf-8") as fh:
-            json.dump(store, fh, indent=2)
+        store["meta"]["updated_at"] = now.isoformat() + "Z"
+        payload = self._serializable(store)
+
+        # Serialize once (compactly) and reuse the bytes for both files.
+        data = self._dumps(payload, indent=False)
+
+        if snapshot:
+            # Skip the snapshot when the template content is unchanged, so
+            # versions/ grows with meaningful edits rather than keystrokes.
+            # meta.updated_at is excluded because it differs on every save.
+            content_hash = hashlib.blake2b(
+                self._dumps({"templates": payload.get("templates", [])}, indent=False),
+                digest_size=16,
+            ).hexdigest()
+            if content_hash != self._last_snapshot_hash():
+                timestamp = now.strftime("%Y%m%d-%H%M%S")
+                snapshot_path = os.path.join(self.versions_dir, f"prompts-{timestamp}.json")
+                self._pending_snapshots.append(
+                    _IO_POOL.submit(_write_snapshot, snapshot_path, data, self._hash_path, content_hash)
+                )
+
+        # Write-then-rename keeps the canonical file intact if we crash mid-write.
+        tmp_path = self.data_path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, self.data_path)
+
+        # Surface errors from earlier background snapshot writes only after
+        # the canonical file is safely on disk.
+        self._reap_snapshots()
+
+    @property
+    def _hash_path(self) -> str:
+        return os.path.join(self.versions_dir, ".last_hash")
+
+    def _last_snapshot_hash(self) -> Optional[str]:
+        try:
+            with open(self._hash_path, "r", encoding="utf-8") as fh:
+                return fh.read().strip()
+        except OSError:
+            return None
+
+    def _reap_snapshots(self) -> None:
+        """Drop finished background snapshot writes, re-raising any failure.
+
+        All done futures — including failed ones — are removed from the
+        pending list before raising, so one bad write is reported once
+        instead of poisoning every subsequent save.
+        """
+        pending, errors = [], []
+        for fut in self._pending_snapshots:
+            if not fut.done():
+                pending.append(fut)
+                continue
+            exc = fut.exception()
+            if exc is not None:
+                errors.append(exc)
+        self._pending_snapshots = pending
+        if errors:
+            raise errors[0]
+
+    def _import_path(self, extension: str) -> str:
+        safe_ext = extension.lstrip(".") or "dat"
+        filename = f"import-{int(datetime.utcnow().timestamp())}.{safe_ext}"
+        return os.path.join(self.imports_dir, filename)
 
     def record_import(self, payload: bytes, extension: str) -> Optional[str]:
         """Persist a copy of an imported file for traceability."""
         self._ensure_dirs()
-        safe_ext = extension.lstrip(".") or "dat"
-        filename = f"import-{int(datetime.utcnow().timestamp())}.{safe_ext}"
-        path = os.path.join(self.imports_dir, filename)
+        path = self._import_path(extension)
         with open(path, "wb") as fh:
             fh.write(payload)
         return path
+
+    def record_import_file(self, fileobj: BinaryIO, extension: str) -> Optional[str]:
+        """Stream an imported upload to the imports dir in chunks."""
+        self._ensure_dirs()
+        path = self._import_path(extension)
+        with open(path, "wb") as fh:
+            shutil.copyfileobj(fileobj, fh, length=1 << 20)
+        return path